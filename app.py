@@ -1,9 +1,18 @@
+import io
 import os
+import html
 import re
 import time
-import difflib
+import json
+import sqlite3
+import tempfile
+import hashlib
+import heapq
+from collections.abc import Mapping
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Dict, List, NamedTuple, Optional, Tuple
 import streamlit as st
 from streamlit_option_menu import option_menu
 
@@ -13,19 +22,23 @@ from streamlit_option_menu import option_menu
 try:
     from veritas_utils import (
         extract_text_from_txt_bytes,
-        extract_text_from_docx_bytes,
-        extract_text_from_pdf_bytes,
+        extract_text_from_bytes,
         compute_matches,
         highlight_text,
     )
 except ImportError:
     # Fallbacks para não quebrar o app se faltar arquivo
     def extract_text_from_txt_bytes(b): return b.decode("utf-8", errors="ignore")
-    def extract_text_from_docx_bytes(b): return "Erro: veritas_utils não encontrado."
-    def extract_text_from_pdf_bytes(b): return "Erro: veritas_utils não encontrado."
+    def extract_text_from_bytes(name, b): return extract_text_from_txt_bytes(b) if name.endswith(".txt") else "Erro: veritas_utils não encontrado."
     def compute_matches(*args): return 0.0, []
     def highlight_text(t, m): return t
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 try:
     from veritas_report import generate_pdf_report, generate_web_pdf_report, generate_ai_pdf_report, generate_ai_docx_report
 except ImportError:
@@ -43,47 +56,145 @@ DISCL = "O Veritas aponta similaridade, não necessariamente plágio. A interpre
 INTERNET_PRIVACY_NOTE = "🔒 **Privacidade**: Buscamos apenas fragmentos aleatórios na web, nunca o texto inteiro."
 AI_HEURISTIC_NOTE = "🤖 Este detector busca padrões estatísticos. Use como indício, não como prova absoluta."
 
+class Profile(NamedTuple):
+    chunk_words: int
+    stride_words: int
+    threshold: float
+    top_k_per_chunk: int
+
 PROFILES = {
-    "Padrão (Equilibrado)": {"chunk_words": 60, "stride_words": 25, "threshold": 0.75, "top_k_per_chunk": 1},
-    "Rigoroso (Cópia Literal)": {"chunk_words": 80, "stride_words": 35, "threshold": 0.85, "top_k_per_chunk": 1},
-    "Sensível (Paráfrase)": {"chunk_words": 40, "stride_words": 15, "threshold": 0.60, "top_k_per_chunk": 1},
+    "Padrão (Equilibrado)": Profile(chunk_words=60, stride_words=25, threshold=0.75, top_k_per_chunk=1),
+    "Rigoroso (Cópia Literal)": Profile(chunk_words=80, stride_words=35, threshold=0.85, top_k_per_chunk=1),
+    "Sensível (Paráfrase)": Profile(chunk_words=40, stride_words=15, threshold=0.60, top_k_per_chunk=1),
 }
 
+# Letras latinas (com acentos) e dígitos; × e ÷ ficam fora do intervalo À-ÿ
+_WORD_RE = re.compile(r"[A-Za-zÀ-ÖØ-öø-ÿ0-9]+")
+
+AI_CONNECTORS = ("além disso", "em suma", "portanto", "todavia", "nesse sentido", "por outro lado", "vale ressaltar", "conclui-se")
+_AI_CONN_RE = re.compile(r"\b(?:" + "|".join(re.escape(c) for c in AI_CONNECTORS) + r")\b")
+
+INPUT_MAX_CHARS = 2_000_000  # teto do texto colado/enviado nas abas de análise
+LIBRARY_MAX_CHARS = 50_000_000  # texto da biblioteca mantido em memória; o excedente vai para disco
+
+SERPAPI_MAX_WORKERS = 8
+SERPAPI_CACHE_PATH = os.path.expanduser("~/.veritas_cache.sqlite")
+SERPAPI_CACHE_TTL = 30 * 24 * 3600
+
 # =========================
 # FUNÇÕES UTILITÁRIAS
 # =========================
+@st.cache_data(show_spinner=False, max_entries=64, ttl=3600)
+def _extract_text(name: str, data: bytes) -> str:
+    # Cache pelo conteúdo do arquivo: reruns do Streamlit não re-processam PDF/DOCX.
+    # É compartilhado entre sessões, por isso expira; uploads da biblioteca não passam por aqui
+    return extract_text_from_bytes(name, data)
+
 def _read_any(uploaded_file) -> str:
     if not uploaded_file: return ""
+    return _extract_text(uploaded_file.name, uploaded_file.getvalue())
+
+# --- BIBLIOTECA: nome -> hash do conteúdo, hash -> texto (conteúdo repetido é guardado uma vez) ---
+# "library_text" é um LRU (dict em ordem de uso) limitado a LIBRARY_MAX_CHARS; o excedente
+# vai para arquivos num diretório temporário da sessão, nomeados pelo hash.
+def _library_spill_path(h: str) -> str:
+    # TemporaryDirectory apaga o diretório quando o estado da sessão é descartado (ou no fim do processo)
+    d = st.session_state.get("library_spill")
+    if d is None: d = st.session_state["library_spill"] = tempfile.TemporaryDirectory(prefix="veritas_lib_")
+    return os.path.join(d.name, h)
+
+def _library_store(h: str, text: str) -> None:
+    mem = st.session_state["library_text"]
+    mem.pop(h, None)
+    mem[h] = text
+    total = sum(len(v) for v in mem.values())
+    while total > LIBRARY_MAX_CHARS and len(mem) > 1:
+        old = next(iter(mem))
+        old_text = mem.pop(old)
+        with open(_library_spill_path(old), "w", encoding="utf-8") as f: f.write(old_text)
+        total -= len(old_text)
+
+def _library_text(h: str) -> Optional[str]:
+    mem = st.session_state["library_text"]
+    if h in mem:
+        mem[h] = mem.pop(h)  # marca como usado recentemente
+        return mem[h]
+    # Documentos em disco são lidos só para esta análise, sem voltar para a memória
+    try:
+        with open(_library_spill_path(h), encoding="utf-8") as f: return f.read()
+    except OSError:
+        return None
+
+def _library_drop(h: str) -> None:
+    if st.session_state["library_text"].pop(h, None) is not None: return
     try:
-        if uploaded_file.name.endswith(".txt"): return extract_text_from_txt_bytes(uploaded_file.getvalue())
-        if uploaded_file.name.endswith(".docx"): return extract_text_from_docx_bytes(uploaded_file.getvalue())
-        if uploaded_file.name.endswith(".pdf"): return extract_text_from_pdf_bytes(uploaded_file.getvalue())
-    except Exception:
-        return ""
-    return ""
+        os.remove(_library_spill_path(h))
+    except OSError:
+        pass
+
+def _library_add(name: str, text: str) -> None:
+    h = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+    if h not in st.session_state["library"].values(): _library_store(h, text)
+    old = st.session_state["library"].get(name)
+    st.session_state["library"][name] = h
+    if old and old != h and old not in st.session_state["library"].values():
+        _library_drop(old)
+
+def _library_remove(name: str) -> None:
+    h = st.session_state["library"].pop(name, None)
+    if h and h not in st.session_state["library"].values():
+        _library_drop(h)
+
+class _LibraryDocs(Mapping):
+    # nome -> texto sob demanda: o compute_matches fatia um documento por vez, então um texto
+    # lido do disco só vive enquanto é fatiado em vez de a biblioteca inteira voltar à memória
+    def __init__(self, names: Dict[str, str]): self._names = names
+    def __getitem__(self, name: str) -> str: return _library_text(self._names[name]) or ""
+    def __iter__(self): return iter(self._names)
+    def __len__(self) -> int: return len(self._names)
+
+def _library_docs() -> Mapping:
+    lib, mem = st.session_state["library"], st.session_state["library_text"]
+    # Arquivo de spill sumiu (ex.: /tmp limpo pelo host): o documento é tratado como removido
+    gone = [name for name, h in lib.items() if h not in mem and not os.path.exists(_library_spill_path(h))]
+    for name in gone: lib.pop(name)
+    if gone: st.warning(f"Documentos indisponíveis removidos da biblioteca: {', '.join(gone)}")
+    return _LibraryDocs(dict(lib))
 
 def _get_serpapi_key() -> Optional[str]:
     return st.secrets.get("SERPAPI_KEY") or os.getenv("SERPAPI_KEY")
 
 def _split_words(text: str) -> List[str]:
-    return re.findall(r"[A-Za-zÀ-ÿ0-9]+", (text or "").lower())
+    return _WORD_RE.findall((text or "").lower())
 
+@st.cache_data(max_entries=32, show_spinner=False)
 def build_chunks(text: str, chunk_words: int, stride_words: int, max_chunks: int = 12) -> List[str]:
     words = _split_words(text)
     if not words: return []
-    chunks = []
-    i = 0
-    while i < len(words) and len(chunks) < max_chunks:
-        chunk = words[i : i + chunk_words]
-        if len(chunk) >= max(12, chunk_words // 2):
+    chunks, seen = [], set()
+    min_words = max(12, chunk_words // 2)
+    # Para assim que houver max_chunks trechos inéditos; janelas curtas só ocorrem no fim do texto
+    for i in range(0, len(words), stride_words):
+        if len(chunks) >= max_chunks: break
+        chunk = tuple(words[i : i + chunk_words])
+        if len(chunk) < min_words: break
+        # Deduplica pela tupla de palavras (hashes já cacheados) e só junta as inéditas
+        if chunk not in seen:
+            seen.add(chunk)
             chunks.append(" ".join(chunk))
-        i += stride_words
-    return list(dict.fromkeys(chunks))
+    return chunks
 
-def seq_similarity(a: str, b: str) -> float:
-    return difflib.SequenceMatcher(None, (a or "").lower(), (b or "").lower()).ratio()
+def _shingles(text: str, k: int = 3) -> frozenset:
+    words = _split_words(text)
+    if len(words) <= k: return frozenset([tuple(words)]) if words else frozenset()
+    return frozenset(zip(*(words[i:] for i in range(k))))
+
+def shingle_similarity(a: frozenset, b: frozenset) -> float:
+    # Sobreposição de trigramas de palavras: snippets curtos contidos no trecho pontuam alto
+    if not a or not b: return 0.0
+    return len(a & b) / min(len(a), len(b))
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class WebHit:
     title: str
     link: str
@@ -91,44 +202,100 @@ class WebHit:
     score: float
     chunk: str
 
-def serpapi_search_chunk(chunk: str, serpapi_key: str, num_results: int = 5) -> List[Dict]:
+@st.cache_resource(show_spinner=False)
+def _http_session():
+    # Sessão compartilhada entre reruns e threads: reaproveita conexões TCP/TLS com a SerpAPI
     import requests
+    from requests.adapters import HTTPAdapter
+    s = requests.Session()
+    s.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=SERPAPI_MAX_WORKERS))
+    return s
+
+# --- CACHE EM DISCO DA SERPAPI (chave = hash do trecho, nunca o texto) ---
+def _serp_cache_key(chunk: str, num_results: int) -> str:
+    return hashlib.blake2b(f"{num_results}|{chunk}".encode("utf-8"), digest_size=16).hexdigest()
+
+def _serp_cache_get(key: str) -> Optional[List[Dict]]:
+    try:
+        with closing(sqlite3.connect(SERPAPI_CACHE_PATH)) as db:
+            row = db.execute("SELECT ts, body FROM serp WHERE k = ?", (key,)).fetchone()
+    except sqlite3.Error:
+        return None
+    if not row or time.time() - row[0] > SERPAPI_CACHE_TTL: return None
+    try:
+        return _json_loads(row[1])
+    except ValueError:
+        # Linha corrompida (orjson.JSONDecodeError também é ValueError): conta como miss
+        return None
+
+def _serp_cache_put(key: str, results: List[Dict]) -> None:
+    try:
+        with closing(sqlite3.connect(SERPAPI_CACHE_PATH)) as db:
+            db.execute("CREATE TABLE IF NOT EXISTS serp (k TEXT PRIMARY KEY, ts REAL, body TEXT)")
+            now = time.time()
+            # Remove entradas vencidas para o arquivo não crescer indefinidamente
+            db.execute("DELETE FROM serp WHERE ts < ?", (now - SERPAPI_CACHE_TTL,))
+            db.execute("INSERT OR REPLACE INTO serp VALUES (?, ?, ?)", (key, now, json.dumps(results)))
+            db.commit()
+    except sqlite3.Error:
+        pass
+
+def serpapi_search_chunk(chunk: str, serpapi_key: str, num_results: int = 5, session=None, use_cache: bool = True) -> List[Dict]:
+    import requests
+    key = _serp_cache_key(chunk, num_results)
+    cached = _serp_cache_get(key) if use_cache else None
+    if cached is not None: return cached
     q = f'"{chunk}"' if len(chunk) >= 80 else chunk
     try:
-        r = requests.get("https://serpapi.com/search.json", params={"engine": "google", "q": q, "api_key": serpapi_key, "num": num_results, "hl": "pt", "gl": "br"}, timeout=20)
-        return r.json().get("organic_results", []) or []
+        r = (session or requests).get("https://serpapi.com/search.json", params={"engine": "google", "q": q, "api_key": serpapi_key, "num": num_results, "hl": "pt", "gl": "br"}, timeout=20)
+        data = _json_loads(r.content)
+        results = data.get("organic_results", []) or []
     except:
         return []
+    # Respostas de erro (chave inválida, cota) não vão para o cache
+    if use_cache and "error" not in data: _serp_cache_put(key, results)
+    return results
 
-def web_similarity_scan(text, serpapi_key, profile_params, num_chunks, num_results):
-    chunks = build_chunks(text, int(profile_params["chunk_words"]), int(profile_params["stride_words"]), num_chunks)
-    raw_hits = []
+def web_similarity_scan(text, serpapi_key, profile: Profile, num_chunks, num_results, use_cache: bool = True):
+    chunks = build_chunks(text, profile.chunk_words, profile.stride_words, num_chunks)
+    hits_by_chunk = {}
     bar = st.progress(0)
-    for i, c in enumerate(chunks):
-        results = serpapi_search_chunk(c, serpapi_key, num_results)
-        for it in results:
-            sim = seq_similarity(c, it.get("snippet", ""))
-            if sim > 0.1:
-                raw_hits.append(WebHit(it.get("title", ""), it.get("link", ""), it.get("snippet", ""), sim, c))
-        bar.progress((i + 1) / len(chunks))
+    if chunks:
+        session = _http_session()
+        # Requisições em paralelo (I/O); cada resposta é pontuada assim que chega,
+        # enquanto as demais ainda estão em trânsito
+        with ThreadPoolExecutor(max_workers=min(SERPAPI_MAX_WORKERS, len(chunks))) as ex:
+            futures = {ex.submit(serpapi_search_chunk, c, serpapi_key, num_results, session, use_cache): c for c in chunks}
+            for i, fut in enumerate(as_completed(futures)):
+                c = futures[fut]
+                c_sh = _shingles(c)
+                hits = hits_by_chunk[c] = []
+                for it in fut.result():
+                    sim = shingle_similarity(c_sh, _shingles(it.get("snippet", "")))
+                    if sim > 0.1:
+                        hits.append(WebHit(it.get("title", ""), it.get("link", ""), it.get("snippet", ""), sim, c))
+                bar.progress((i + 1) / len(chunks))
     bar.empty()
-    unique = {}
-    for h in sorted(raw_hits, key=lambda x: x.score, reverse=True):
-        if h.link not in unique: unique[h.link] = h
-    return list(unique.values())[:20]
+    raw_hits = [h for c in chunks for h in hits_by_chunk[c]]
+    best = {}
+    for h in raw_hits:
+        prev = best.get(h.link)
+        if prev is None or h.score > prev.score: best[h.link] = h
+    return heapq.nlargest(20, best.values(), key=lambda x: x.score)
 
 # --- LÓGICA DE IA MELHORADA (COM EXPLICAÇÕES) ---
+@st.cache_data(max_entries=32, show_spinner=False)
 def analyze_ai_indicia(text: str) -> Dict:
     text = (text or "").strip()
-    words = _split_words(text)
+    low = text.lower()
+    words = _WORD_RE.findall(low)
     if not words: return {"score": 0, "band": ("gray", "Indefinido"), "metrics": {"ttr": 0, "conn": 0}, "msg": "Texto insuficiente.", "reasons": []}
     
     # 1. Riqueza (TTR)
     unique_ratio = len(set(words)) / len(words)
     
     # 2. Conectores
-    ai_conn = ["além disso", "em suma", "portanto", "todavia", "nesse sentido", "por outro lado", "vale ressaltar", "conclui-se"]
-    conn_count = sum(text.lower().count(c) for c in ai_conn)
+    conn_count = len(_AI_CONN_RE.findall(low))
     conn_density = (conn_count / len(words)) * 1000
     
     score = 0
@@ -177,12 +344,51 @@ def _inject_css():
     </style>
     """, unsafe_allow_html=True)
 
+def _text_input_block(key_prefix: str, paste_label: str, upload_label: str, default_name: str) -> Tuple[str, str]:
+    # Entrada comum das abas (colar ou enviar arquivo); devolve (nome, texto)
+    tab_p, tab_u = st.tabs(["📝 Colar", "📁 Upload"])
+    name, text = default_name, ""
+    with tab_p:
+        t = st.text_area(paste_label, height=200, key=f"{key_prefix}_in_paste")
+        if t: text = t
+    with tab_u:
+        f = st.file_uploader(upload_label, type=["docx", "pdf", "txt"], key=f"{key_prefix}_in_up")
+        if f:
+            text, name = _read_any(f), f.name
+            st.success(f"Lido: {f.name}")
+    # Limita o trabalho de todas as análises a jusante (chunks, TF-IDF, heurística)
+    if len(text) > INPUT_MAX_CHARS:
+        text = text[:INPUT_MAX_CHARS]
+        st.warning(f"Texto muito longo: serão analisados apenas os primeiros {INPUT_MAX_CHARS:,} caracteres.".replace(",", "."))
+    return name, text
+
+# --- RELATÓRIOS EM MEMÓRIA (cacheados até o resultado mudar) ---
+@st.cache_data(show_spinner=False, max_entries=16)
+def _pdf_local_bytes(name: str, sim: float, matches: list) -> bytes:
+    buf = io.BytesIO()
+    generate_pdf_report(buf, "Veritas Local", name, sim, matches, {}, DISCL)
+    return buf.getvalue()
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _pdf_web_bytes(hits: list) -> bytes:
+    buf = io.BytesIO()
+    generate_web_pdf_report(buf, "Veritas Web", "Busca Web", "Padrão", 0.0, hits, DISCL)
+    return buf.getvalue()
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _pdf_ai_bytes(name: str, res: dict) -> bytes:
+    buf = io.BytesIO()
+    generate_ai_pdf_report(buf, "Veritas IA", name, res, AI_HEURISTIC_NOTE)
+    return buf.getvalue()
+
 # =========================
 # APP PRINCIPAL
 # =========================
 st.set_page_config(page_title=APP_TITLE, layout="wide", page_icon="🔍")
 
 if "library" not in st.session_state: st.session_state["library"] = {}
+if "library_text" not in st.session_state: st.session_state["library_text"] = {}
+if "library_uploads" not in st.session_state: st.session_state["library_uploads"] = set()
 if "last_result" not in st.session_state: st.session_state["last_result"] = None
 if "internet_last" not in st.session_state: st.session_state["internet_last"] = None
 if "ai_last" not in st.session_state: st.session_state["ai_last"] = None
@@ -209,6 +415,7 @@ with st.sidebar:
     st.session_state["profile"] = st.selectbox("Perfil", list(PROFILES.keys()))
     if _get_serpapi_key(): st.success("✅ SerpAPI OK")
     else: st.warning("⚠️ SerpAPI Off")
+    st.checkbox("Não guardar buscas web em cache", key="serp_no_cache", help="Consulta sempre a SerpAPI e não grava os resultados em disco.")
     st.divider()
     st.caption("Allminds © 2026")
 
@@ -217,17 +424,7 @@ if selected == "Biblioteca":
     st.subheader("📂 Comparação Local")
     c1, c2 = st.columns([1, 1.2])
     with c1:
-        tab_p, tab_u = st.tabs(["📝 Colar", "📁 Upload"])
-        q_text = ""
-        q_name = "Texto Inserido"
-        with tab_p:
-            t = st.text_area("Texto:", height=200)
-            if t: q_text = t
-        with tab_u:
-            f = st.file_uploader("Arquivo (Biblio)", type=["docx", "pdf", "txt"], key="lib_up_input")
-            if f: 
-                q_text = _read_any(f)
-                q_name = f.name
+        q_name, q_text = _text_input_block("lib", "Texto:", "Arquivo (Biblio)", "Texto Inserido")
         
         if st.button("🔍 Comparar", type="primary", disabled=not q_text):
             if not st.session_state["library"]:
@@ -235,7 +432,7 @@ if selected == "Biblioteca":
             else:
                 p = PROFILES[st.session_state["profile"]]
                 with st.spinner("Analisando..."):
-                    sim, matches = compute_matches(q_text, st.session_state["library"], p["chunk_words"], p["stride_words"], p["top_k_per_chunk"], p["threshold"])
+                    sim, matches = compute_matches(q_text, _library_docs(), p.chunk_words, p.stride_words, p.top_k_per_chunk, p.threshold)
                     st.session_state["last_result"] = {"sim": sim, "matches": matches, "name": q_name, "text": q_text}
 
     with c2:
@@ -270,16 +467,7 @@ elif selected == "Internet":
     st.markdown(f"<div class='disclaimer-box'>{INTERNET_PRIVACY_NOTE}</div>", unsafe_allow_html=True)
     c1, c2 = st.columns([1, 1.2])
     with c1:
-        tab_web_p, tab_web_u = st.tabs(["📝 Colar", "📁 Upload"])
-        w_text = ""
-        with tab_web_p:
-            t = st.text_area("Texto para Web:", height=200, key="web_in_paste")
-            if t: w_text = t
-        with tab_web_u:
-            f = st.file_uploader("Arquivo (Web)", type=["docx", "pdf", "txt"], key="web_in_up")
-            if f:
-                w_text = _read_any(f)
-                st.success(f"Lido: {f.name}")
+        _, w_text = _text_input_block("web", "Texto para Web:", "Arquivo (Web)", "Busca Web")
         
         if st.button("Buscar na Web", type="primary", disabled=not w_text):
             if not _get_serpapi_key():
@@ -287,14 +475,18 @@ elif selected == "Internet":
             else:
                 p = PROFILES[st.session_state["profile"]]
                 with st.spinner("Buscando..."):
-                    hits = web_similarity_scan(w_text, _get_serpapi_key(), p, 5, 5)
+                    hits = web_similarity_scan(w_text, _get_serpapi_key(), p, 5, 5, use_cache=not st.session_state.get("serp_no_cache"))
                     st.session_state["internet_last"] = {"hits": hits, "name": "Busca Web"}
 
     with c2:
         w_res = st.session_state["internet_last"]
         if w_res and w_res["hits"]:
-            for h in w_res["hits"]:
-                st.markdown(f"""<div class="result-card"><a href="{h.link}" target="_blank"><b>{h.title}</b></a><br><span style="color:red">{h.score*100:.0f}%</span> - {h.snippet}</div>""", unsafe_allow_html=True)
+            # Todos os cards num único st.markdown; título/snippet vêm da web e são escapados
+            cards = "".join(
+                f"""<div class="result-card"><a href="{html.escape(h.link)}" target="_blank"><b>{html.escape(h.title)}</b></a><br><span style="color:red">{h.score*100:.0f}%</span> - {html.escape(h.snippet)}</div>"""
+                for h in w_res["hits"]
+            )
+            st.markdown(cards, unsafe_allow_html=True)
         elif w_res:
             st.success("Nada encontrado.")
 
@@ -304,18 +496,7 @@ elif selected == "IA":
     st.markdown(f"<div class='disclaimer-box'>{AI_HEURISTIC_NOTE}</div>", unsafe_allow_html=True)
     c1, c2 = st.columns([1, 1.2])
     with c1:
-        tab_ai_p, tab_ai_u = st.tabs(["📝 Colar", "📁 Upload"])
-        ai_text = ""
-        ai_name = "Texto IA"
-        with tab_ai_p:
-            t = st.text_area("Texto IA:", height=200, key="ai_in_paste")
-            if t: ai_text = t
-        with tab_ai_u:
-            f = st.file_uploader("Arquivo (IA)", type=["docx", "pdf", "txt"], key="ai_in_up")
-            if f:
-                ai_text = _read_any(f)
-                ai_name = f.name
-                st.success(f"Lido: {f.name}")
+        ai_name, ai_text = _text_input_block("ai", "Texto IA:", "Arquivo (IA)", "Texto IA")
 
         if st.button("Verificar IA", type="primary", disabled=not ai_text):
             res = analyze_ai_indicia(ai_text)
@@ -359,33 +540,31 @@ elif selected == "Relatórios":
         st.markdown("**Biblioteca**")
         r = st.session_state["last_result"]
         if r and generate_pdf_report:
-            if st.button("PDF (Local)"):
-                generate_pdf_report("Relatorio_Local.pdf", "Veritas Local", r["name"], r["sim"], r["matches"], {}, DISCL)
-                with open("Relatorio_Local.pdf", "rb") as f: st.download_button("📥 Baixar", f, "Relatorio_Local.pdf")
+            st.download_button("📥 PDF (Local)", _pdf_local_bytes(r["name"], r["sim"], r["matches"]), "Relatorio_Local.pdf", mime="application/pdf")
     
     with c2:
         st.markdown("**Internet**")
         w = st.session_state["internet_last"]
         if w and w["hits"] and generate_web_pdf_report:
-            if st.button("PDF (Web)"):
-                generate_web_pdf_report("Relatorio_Web.pdf", "Veritas Web", "Busca Web", "Padrão", 0.0, w["hits"], DISCL)
-                with open("Relatorio_Web.pdf", "rb") as f: st.download_button("📥 Baixar", f, "Relatorio_Web.pdf")
+            st.download_button("📥 PDF (Web)", _pdf_web_bytes(w["hits"]), "Relatorio_Web.pdf", mime="application/pdf")
 
     with c3:
         st.markdown("**IA**")
         a = st.session_state["ai_last"]
         if a and generate_ai_pdf_report:
-            if st.button("PDF (IA)"):
-                # Variáveis encurtadas para evitar erro de string longa
-                generate_ai_pdf_report("Relatorio_IA.pdf", "Veritas IA", a["name"], a["res"], AI_HEURISTIC_NOTE)
-                with open("Relatorio_IA.pdf", "rb") as f: st.download_button("📥 Baixar", f, "Relatorio_IA.pdf")
+            st.download_button("📥 PDF (IA)", _pdf_ai_bytes(a["name"], a["res"]), "Relatorio_IA.pdf", mime="application/pdf")
 
 # --- 5. GERENCIAR ---
 elif selected == "Gerenciar":
     st.subheader("📚 Gerenciar Biblioteca")
     ups = st.file_uploader("Adicionar arquivos", accept_multiple_files=True)
     if ups:
-        for u in ups: st.session_state["library"][u.name] = _read_any(u)
+        # Só processa uploads ainda não lidos nesta sessão
+        new = [u for u in ups if u.file_id not in st.session_state["library_uploads"]]
+        for u in new:
+            # Sem cache: o texto fica só na biblioteca da sessão, sujeito a LIBRARY_MAX_CHARS
+            _library_add(u.name, extract_text_from_bytes(u.name, u.getvalue()))
+            st.session_state["library_uploads"].add(u.file_id)
         st.success("Adicionados!")
     
     if st.session_state["library"]:
@@ -393,5 +572,5 @@ elif selected == "Gerenciar":
             c1, c2 = st.columns([4,1])
             c1.text(k)
             if c2.button("🗑️", key=f"del_{k}"):
-                del st.session_state["library"][k]
+                _library_remove(k)
                 st.rerun()
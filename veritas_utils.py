@@ -1,10 +1,12 @@
 from __future__ import annotations
 import re
 from dataclasses import dataclass
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Mapping
 
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import numpy as np
+
+_NON_WORD_RE = re.compile(r"[^\w\sáàâãéèêíïóôõöúçñ]", flags=re.UNICODE)
+_SPACES_RE = re.compile(r"\s+")
 
 def extract_text_from_txt_bytes(b: bytes) -> str:
     return b.decode("utf-8", errors="ignore")
@@ -39,10 +41,19 @@ def extract_text_from_pdf_bytes(b: bytes) -> str:
             parts.append(tx)
     return "\n\n".join(parts)
 
+def extract_text_from_bytes(name: str, b: bytes) -> str:
+    try:
+        if name.endswith(".txt"): return extract_text_from_txt_bytes(b)
+        if name.endswith(".docx"): return extract_text_from_docx_bytes(b)
+        if name.endswith(".pdf"): return extract_text_from_pdf_bytes(b)
+    except Exception:
+        return ""
+    return ""
+
 def normalize_text(s: str) -> str:
     s = s.lower()
-    s = re.sub(r"[^\w\sáàâãéèêíïóôõöúçñ]", " ", s, flags=re.UNICODE)
-    s = re.sub(r"\s+", " ", s).strip()
+    s = _NON_WORD_RE.sub(" ", s)
+    s = _SPACES_RE.sub(" ", s).strip()
     return s
 
 def word_chunks(text: str, chunk_words: int = 60, stride_words: int = 20) -> List[str]:
@@ -70,12 +81,13 @@ class Match:
 
 def compute_matches(
     query_text: str,
-    corpus_docs: Dict[str, str],
+    corpus_docs: Mapping[str, str],
     chunk_words: int = 60,
     stride_words: int = 20,
     top_k_per_chunk: int = 1,
     threshold: float = 0.75,
 ) -> Tuple[float, List[Match]]:
+    from sklearn.feature_extraction.text import TfidfVectorizer
     qn = normalize_text(query_text)
     q_chunks = word_chunks(qn, chunk_words=chunk_words, stride_words=stride_words)
     if not q_chunks:
@@ -91,29 +103,34 @@ def compute_matches(
         return 0.0, []
 
     all_texts = q_chunks + [c for _, c in doc_chunk_map]
-    vectorizer = TfidfVectorizer(ngram_range=(1,2), min_df=1)
+    # float32 basta para ranquear cossenos e reduz pela metade a memória da matriz esparsa
+    vectorizer = TfidfVectorizer(ngram_range=(1,2), min_df=1, dtype=np.float32)
     X = vectorizer.fit_transform(all_texts)
     Q = X[:len(q_chunks)]
     D = X[len(q_chunks):]
 
-    sim = cosine_similarity(Q, D)
+    # O TfidfVectorizer já normaliza as linhas (L2): o cosseno é o produto esparso Q·Dᵀ
+    sim = (Q @ D.T).toarray()
     best_scores = sim.max(axis=1)
     global_sim = float(best_scores.mean())
 
     matches: List[Match] = []
-    for i in range(sim.shape[0]):
-        row = sim[i]
-        top_idx = row.argsort()[::-1][:top_k_per_chunk]
-        for j in top_idx:
-            score = float(row[j])
-            if score >= threshold:
-                docname, src_chunk = doc_chunk_map[int(j)]
-                matches.append(Match(
-                    query_chunk=q_chunks[i],
-                    source_doc=docname,
-                    source_chunk=src_chunk,
-                    score=score
-                ))
+    k = min(top_k_per_chunk, sim.shape[1])
+    if k > 0:
+        # Top-k por linha sem ordenar a linha inteira
+        top_idx = np.argpartition(-sim, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(sim, top_idx, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top_idx = np.take_along_axis(top_idx, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        for i, r in zip(*np.nonzero(top_scores >= threshold)):
+            docname, src_chunk = doc_chunk_map[int(top_idx[i, r])]
+            matches.append(Match(
+                query_chunk=q_chunks[i],
+                source_doc=docname,
+                source_chunk=src_chunk,
+                score=float(top_scores[i, r])
+            ))
 
     uniq = {}
     for m in matches:
@@ -124,15 +141,15 @@ def compute_matches(
     return global_sim, matches
 
 def highlight_text(query_text: str, matches: List[Match]) -> str:
-    out = query_text
+    patterns = []
     for m in matches[:20]:
-        words = m.query_chunk.split()
-        snippet = " ".join(words[: min(12, len(words))])
-        if len(snippet) < 20:
-            continue
-        pattern = re.sub(r"\s+", r"\\s+", re.escape(snippet))
-        try:
-            out = re.sub(pattern, lambda mo: f"⟦{mo.group(0)}⟧", out, flags=re.IGNORECASE)
-        except re.error:
+        words = m.query_chunk.split()[:12]
+        if len(" ".join(words)) < 20:
             continue
-    return out
+        # Os trechos vêm normalizados (pontuação -> espaço): aceita qualquer separador entre as palavras
+        patterns.append(r"\W+".join(re.escape(w) for w in words))
+    if not patterns:
+        return query_text
+    # Uma única varredura do texto com todos os trechos, em vez de um re.sub por trecho
+    combined = re.compile("|".join(dict.fromkeys(patterns)), flags=re.IGNORECASE)
+    return combined.sub(lambda mo: f"⟦{mo.group(0)}⟧", query_text)